@@ -3,20 +3,42 @@ Simple ADK-style Multi-Agent Travel Planner (single-file)
 - Lightweight prototype for demo / course submission (Option A)
 - Agents: Planner, Search (fake), Budget, Summarizer
 - Frontend served from same file (no Node/Vite)
-- Run: python simple_travel_planner.py
+- Run: python simple_travel_planner.py  (multi-worker, no access log)
+  or: TRAVEL_DEV=1 python simple_travel_planner.py  (single worker, auto-reload)
   or: uvicorn simple_travel_planner:app --reload
+- Metrics and caches live in each worker process: with several workers, /health and the
+  "metrics" field of /plan report only the worker that answered, not global totals
 """
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ValidationError
+import orjson
+import array
 import asyncio
+import gzip
+import hashlib
+import itertools
 import random
+import secrets
 import time
-import uuid
+import zlib
 import logging
-from typing import Dict, Any, List
+import sys
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Tuple
+
+try:
+    import uvloop
+except ImportError:  # optional speedup; falls back to the default asyncio loop
+    uvloop = None
+
+# Install uvloop for any ASGI server importing this module (uvloop has no Windows build)
+if uvloop is not None and sys.platform != "win32":
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 # ----------------------------
 # Logging & simple metrics
@@ -24,19 +46,82 @@ from typing import Dict, Any, List
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s %(message)s')
 logger = logging.getLogger("simple_travel_planner")
 
+# next() on itertools.count is a single C-level increment (no dict read-modify-write);
+# the value it returns is stored as-is, so METRICS can be read directly
+_plans_counter = itertools.count(1)
+_agent_counter = itertools.count(1)
 METRICS = {"plans_created": 0, "agent_calls": 0}
 
+def metrics_snapshot() -> Dict[str, int]:
+    return dict(METRICS)
+
+# ----------------------------
+# Once-per-second refresh of per-response values that don't need to be exact:
+# "generated_at" (second precision) and the serialized /health body
+# ----------------------------
+_TIME_FMT = "%Y-%m-%d %H:%M:%S"
+_NOW_STR = time.strftime(_TIME_FMT, time.localtime())
+
+def _health_bytes() -> bytes:
+    return orjson.dumps({"status": "ok", "metrics": metrics_snapshot()})
+
+_HEALTH_BYTES = _health_bytes()
+
+async def _ticker() -> None:
+    global _NOW_STR, _HEALTH_BYTES
+    while True:
+        _NOW_STR = time.strftime(_TIME_FMT, time.localtime())
+        _HEALTH_BYTES = _health_bytes()
+        await asyncio.sleep(1)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ticker = asyncio.create_task(_ticker())
+    try:
+        yield
+    finally:
+        ticker.cancel()
+
 # ----------------------------
-# FastAPI app + CORS
+# FastAPI app + CORS + gzip
 # ----------------------------
-app = FastAPI(title="Simple Travel Planner (Prototype)")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Policy is fully permissive, so CORS is just static headers (no per-request origin matching)
+_CORS_ORIGIN_HEADER = (b"access-control-allow-origin", b"*")
+_CORS_PREFLIGHT_HEADERS = [
+    _CORS_ORIGIN_HEADER,
+    (b"access-control-allow-methods", b"*"),
+    (b"access-control-allow-headers", b"*"),
+    (b"access-control-max-age", b"600"),
+]
+
+class PermissiveCORSMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "OPTIONS":
+            # Answer preflight directly without touching the app
+            await send({"type": "http.response.start", "status": 204, "headers": _CORS_PREFLIGHT_HEADERS})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if not any(name == b"access-control-allow-origin" for name, _ in headers):
+                    headers.append(_CORS_ORIGIN_HEADER)
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+app = FastAPI(title="Simple Travel Planner (Prototype)", lifespan=lifespan)
+app.add_middleware(PermissiveCORSMiddleware)
+# Compress larger responses (e.g. the nested /plan JSON); tiny ones aren't worth it
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
 
 # ----------------------------
 # Simple frontend (served by same app)
@@ -93,9 +178,26 @@ INDEX_HTML = """
 </html>
 """
 
+# Page never changes at runtime: encode, gzip + hash once, let browsers revalidate via ETag
+_INDEX_BYTES = INDEX_HTML.encode("utf-8")
+_INDEX_GZ = gzip.compress(_INDEX_BYTES, 6)
+_INDEX_DIGEST = hashlib.md5(_INDEX_BYTES).hexdigest()
+_INDEX_ETAG = f'"{_INDEX_DIGEST}"'
+_INDEX_GZ_ETAG = f'"{_INDEX_DIGEST}-gz"'
+_INDEX_HEADERS = {"ETag": _INDEX_ETAG, "Cache-Control": "public, max-age=3600"}
+# GZipMiddleware adds Vary itself except to responses it passes through (already encoded)
+_INDEX_GZ_HEADERS = {**_INDEX_HEADERS, "ETag": _INDEX_GZ_ETAG, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+
 @app.get("/", response_class=HTMLResponse)
-def homepage():
-    return INDEX_HTML
+def homepage(request: Request):
+    # Already-compressed body: GZipMiddleware passes responses with Content-Encoding through untouched
+    use_gz = "gzip" in request.headers.get("accept-encoding", "")
+    etag, headers = (_INDEX_GZ_ETAG, _INDEX_GZ_HEADERS) if use_gz else (_INDEX_ETAG, _INDEX_HEADERS)
+    if request.headers.get("if-none-match") == etag:
+        # A 304 must repeat the 200's Vary; for the plain variant that header comes from GZipMiddleware
+        not_modified = {k: v for k, v in headers.items() if k != "Content-Encoding"}
+        return Response(status_code=304, headers={**not_modified, "Vary": "Accept-Encoding"})
+    return Response(content=_INDEX_GZ if use_gz else _INDEX_BYTES, media_type="text/html", headers=headers)
 
 # ----------------------------
 # Request/response models
@@ -109,58 +211,81 @@ class PlanRequest(BaseModel):
 # ----------------------------
 # Agent implementations (lightweight)
 # ----------------------------
-async def planner_agent(req: PlanRequest) -> Dict[str, Any]:
-    METRICS["agent_calls"] += 1
-    logger.info(f"[Planner] Creating tasks for trip {req.from_city} -> {req.to_city}")
+# Task query templates (bound str.format, built once)
+_FLIGHT_TMPL = "cheap flights from {a} to {b}".format
+_HOTEL_TMPL = "budget hotels in {b}".format
+_PLACES_TMPL = "top attractions in {b}".format
+
+def planner_agent(req: PlanRequest) -> Dict[str, Any]:
+    METRICS["agent_calls"] = next(_agent_counter)
+    logger.info("[Planner] Creating tasks for trip %s -> %s", req.from_city, req.to_city)
     # Break request into simple tasks (strings)
     tasks = {
-        "flight_query": f"cheap flights from {req.from_city} to {req.to_city}",
-        "hotel_query": f"budget hotels in {req.to_city}",
-        "places_query": f"top attractions in {req.to_city}"
+        "flight_query": _FLIGHT_TMPL(a=req.from_city, b=req.to_city),
+        "hotel_query": _HOTEL_TMPL(b=req.to_city),
+        "places_query": _PLACES_TMPL(b=req.to_city)
     }
-    # simulate small delay
-    await asyncio.sleep(0.05)
     return {"tasks": tasks}
 
+# Fake search data: 256-slot tables generated once, indexed by a hash of the query
+_rng = random.Random(0)
+_AIRFAST_PRICES = array.array("i", [_rng.randint(4000, 12000) for _ in range(256)])
+_SKYGO_PRICES = array.array("i", [_rng.randint(4500, 14000) for _ in range(256)])
+_BUDGET_INN_PRICES = array.array("i", [_rng.randint(800, 2500) for _ in range(256)])
+_COMFORT_STAY_PRICES = array.array("i", [_rng.randint(1500, 4000) for _ in range(256)])
+_BUDGET_INN_RATINGS = array.array("d", [round(3 + _rng.random(), 1) for _ in range(256)])
+_COMFORT_STAY_RATINGS = array.array("d", [round(3 + _rng.random(), 1) for _ in range(256)])
+del _rng
+
 async def search_agent(tasks: Dict[str, str]) -> Dict[str, Any]:
-    METRICS["agent_calls"] += 1
+    METRICS["agent_calls"] = next(_agent_counter)
     logger.info("[Search] Running fake searches for tasks")
-    # Simulate parallel-ish search results (fake/synthetic)
-    await asyncio.sleep(0.12)
+    # Simulate parallel-ish search results (fake/synthetic, stable per destination)
+    # crc32 rather than hash(): str hashing is salted per process (PYTHONHASHSEED)
+    h = zlib.crc32(tasks["places_query"].encode()) & 0xFF
     flights = [
-        {"airline": "AirFast", "price": random.randint(4000, 12000), "depart": "06:00", "arrive": "09:00"},
-        {"airline": "SkyGo", "price": random.randint(4500, 14000), "depart": "12:00", "arrive": "15:00"}
+        {"airline": "AirFast", "price": _AIRFAST_PRICES[h], "depart": "06:00", "arrive": "09:00"},
+        {"airline": "SkyGo", "price": _SKYGO_PRICES[h], "depart": "12:00", "arrive": "15:00"}
     ]
     hotels = [
-        {"name": "Budget Inn", "price_per_night": random.randint(800, 2500), "rating": round(3 + random.random(), 1)},
-        {"name": "Comfort Stay", "price_per_night": random.randint(1500, 4000), "rating": round(3 + random.random(), 1)}
+        {"name": "Budget Inn", "price_per_night": _BUDGET_INN_PRICES[h], "rating": _BUDGET_INN_RATINGS[h]},
+        {"name": "Comfort Stay", "price_per_night": _COMFORT_STAY_PRICES[h], "rating": _COMFORT_STAY_RATINGS[h]}
     ]
     places = [f"{tasks['places_query']} - {i+1}" for i in range(5)]
     return {"flights": flights, "hotels": hotels, "places": places}
 
-async def budget_agent(search_result: Dict[str, Any], req: PlanRequest) -> Dict[str, Any]:
-    METRICS["agent_calls"] += 1
+def compute_budget(flights: List[Dict[str, Any]], hotels: List[Dict[str, Any]], budget: int, days: int) -> Dict[str, Any]:
+    METRICS["agent_calls"] = next(_agent_counter)
     logger.info("[Budget] Calculating budget")
-    days = max(1, req.days)
-    cheapest_flight = min((f["price"] for f in search_result["flights"]), default=0)
-    cheapest_hotel = min((h["price_per_night"] for h in search_result["hotels"]), default=0)
+    days = max(1, days)
+    # Single pass per list with a running min (0 when a list is empty)
+    cheapest_flight = None
+    for f in flights:
+        price = f["price"]
+        if cheapest_flight is None or price < cheapest_flight:
+            cheapest_flight = price
+    cheapest_hotel = None
+    for h in hotels:
+        price = h["price_per_night"]
+        if cheapest_hotel is None or price < cheapest_hotel:
+            cheapest_hotel = price
+    cheapest_flight = cheapest_flight or 0
+    cheapest_hotel = cheapest_hotel or 0
     food = 400 * days
     transport = 250 * days
     total = cheapest_flight + (cheapest_hotel * days) + food + transport
-    status = "within_budget" if total <= req.budget else "over_budget"
-    # tiny delay
-    await asyncio.sleep(0.02)
+    status = "within_budget" if total <= budget else "over_budget"
     return {"total": total, "status": status, "breakdown": {"flight": cheapest_flight, "hotel_per_night": cheapest_hotel, "food": food, "transport": transport}}
 
-async def summarizer_agent(req: PlanRequest, search_result: Dict[str, Any], budget_result: Dict[str, Any]) -> Dict[str, Any]:
-    METRICS["agent_calls"] += 1
+def build_itinerary(req: PlanRequest, search_result: Dict[str, Any]) -> List[str]:
+    # Only depends on the request + places, so it is independent of the budget
+    places = search_result.get("places") or ["Local exploration"]
+    return [f"Day {i+1}: {p}" for i, p in enumerate(itertools.islice(itertools.cycle(places), max(0, req.days)))]
+
+def summarizer_agent(req: PlanRequest, search_result: Dict[str, Any], budget_result: Dict[str, Any], itinerary: List[str]) -> Dict[str, Any]:
+    METRICS["agent_calls"] = next(_agent_counter)
     logger.info("[Summarizer] Creating final plan summary")
-    plan_id = str(uuid.uuid4())
-    itinerary = []
-    places = search_result.get("places", [])
-    for d in range(req.days):
-        itinerary.append(f"Day {d+1}: {places[d % len(places)] if places else 'Local exploration'}")
-    await asyncio.sleep(0.01)
+    plan_id = secrets.token_hex(16)
     summary = {
         "plan_id": plan_id,
         "from": req.from_city,
@@ -173,43 +298,135 @@ async def summarizer_agent(req: PlanRequest, search_result: Dict[str, Any], budg
     return summary
 
 # ----------------------------
-# Main orchestration endpoint
+# Caches (LRU via OrderedDict)
+# - route cache: planner + search output only depends on the city pair
+# - response cache: identical requests reuse the computed summary + raw sections for a while
+#   (plan_id, metrics and generated_at are filled in fresh per response)
 # ----------------------------
-@app.post("/plan")
-async def create_plan(req: PlanRequest):
-    METRICS["plans_created"] += 1
-    # 1) Planner
-    planner_res = await planner_agent(req)
-    # 2) Search (could be parallel across subqueries; single agent simulates parallel work)
-    search_res = await search_agent(planner_res["tasks"])
-    # 3) Budget
-    budget_res = await budget_agent(search_res, req)
-    # 4) Summarize
-    summary = await summarizer_agent(req, search_res, budget_res)
+_PLAN_CACHE_SIZE = 1024
+_PLAN_CACHE: "OrderedDict[Tuple[str, str], Tuple[Dict[str, Any], Dict[str, Any]]]" = OrderedDict()
+_RESPONSE_CACHE_SIZE = 2048
+_RESPONSE_CACHE_TTL = 600  # seconds
+_RESPONSE_CACHE: "OrderedDict[Tuple[str, str, int, int], Tuple[float, Tuple[Dict[str, Any], Dict[str, Any]]]]" = OrderedDict()
+
+def _lru_get(cache: OrderedDict, key):
+    hit = cache.get(key)
+    if hit is not None:
+        cache.move_to_end(key)
+    return hit
 
+def _ttl_get(cache: OrderedDict, key, now: float):
+    # Entries are (expires_at, value); stale ones are dropped instead of refreshed
+    hit = cache.get(key)
+    if hit is None:
+        return None
+    if hit[0] <= now:
+        del cache[key]
+        return None
+    cache.move_to_end(key)
+    return hit[1]
+
+def _lru_put(cache: OrderedDict, key, value, maxsize: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > maxsize:
+        cache.popitem(last=False)  # evict least recently used
+
+def _plan_response(plan_id: str, stable_summary: Dict[str, Any], raw: Dict[str, Any]) -> Response:
+    # orjson serializes straight to bytes, so FastAPI's jsonable_encoder is skipped
     response = {
-        "summary": summary,
-        "raw": {"planner": planner_res, "search": search_res, "budget": budget_res},
-        "metrics": METRICS,
-        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+        "summary": {"plan_id": plan_id, **stable_summary},
+        "raw": raw,
+        "metrics": metrics_snapshot(),
+        "generated_at": _NOW_STR
     }
-    return response
+    return Response(content=orjson.dumps(response), media_type="application/json")
+
+# ----------------------------
+# Main orchestration endpoint
+# ----------------------------
+# Body is parsed by hand below, so describe it for OpenAPI / docs explicitly
+@app.post("/plan", response_model=None, openapi_extra={
+    "requestBody": {"required": True, "content": {"application/json": {"schema": PlanRequest.model_json_schema()}}}
+})
+async def create_plan(request: Request):
+    body = await request.body()
+    # Same rule FastAPI applies to typed bodies: only JSON content types are parsed as JSON
+    mime = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if mime != "application/json" and not mime.endswith("+json"):
+        raise RequestValidationError([{
+            "type": "model_attributes_type", "loc": ("body",),
+            "msg": "Input should be a valid dictionary or object to extract fields from",
+            "input": body.decode("utf-8", errors="replace"),
+        }])
+    # Validate straight from the raw bytes (single pass, no intermediate json.loads)
+    try:
+        req = PlanRequest.model_validate_json(body)
+    except ValidationError as exc:
+        errors = []
+        for err in exc.errors(include_url=False):
+            err = {**err, "loc": ("body", *err["loc"])}
+            # Raw-bytes input may not be valid UTF-8; jsonable_encoder would fail on it
+            if isinstance(err.get("input"), bytes):
+                err["input"] = err["input"].decode("utf-8", errors="replace")
+            errors.append(err)
+        raise RequestValidationError(errors)
+    METRICS["plans_created"] = next(_plans_counter)
+    # 0) Identical request seen recently: reuse the computed plan with a fresh id
+    response_key = (req.from_city, req.to_city, req.budget, req.days)
+    now = time.monotonic()
+    hit = _ttl_get(_RESPONSE_CACHE, response_key, now)
+    if hit is not None:
+        return _plan_response(secrets.token_hex(16), *hit)
+    # 1) Planner (plain function) + Search (the only agent that would do real I/O),
+    #    skipped entirely when this route was planned recently
+    route_key = (req.from_city, req.to_city)
+    cached = _lru_get(_PLAN_CACHE, route_key)
+    if cached is not None:
+        planner_res, search_res = cached
+    else:
+        planner_res = planner_agent(req)
+        search_res = await search_agent(planner_res["tasks"])
+        _lru_put(_PLAN_CACHE, route_key, (planner_res, search_res), _PLAN_CACHE_SIZE)
+    # 2) Budget + itinerary (pure computation, no await)
+    budget_res = compute_budget(search_res["flights"], search_res["hotels"], req.budget, req.days)
+    itinerary = build_itinerary(req, search_res)
+    # 3) Summarize
+    summary = summarizer_agent(req, search_res, budget_res, itinerary)
+
+    raw = {"planner": planner_res, "search": search_res, "budget": budget_res}
+    stable_summary = {k: v for k, v in summary.items() if k != "plan_id"}
+    _lru_put(_RESPONSE_CACHE, response_key, (now + _RESPONSE_CACHE_TTL, (stable_summary, raw)), _RESPONSE_CACHE_SIZE)
+    return _plan_response(summary["plan_id"], stable_summary, raw)
 
 # ----------------------------
 # Small health endpoint
 # ----------------------------
-@app.get("/health")
+@app.get("/health", response_model=None)
 def health():
-    return {"status": "ok", "metrics": METRICS}
+    # Metrics here may lag by up to a second (refreshed by _ticker) and cover this worker only
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 # ----------------------------
-# __main__ block: support reload by passing module import string
+# __main__ block: dev (TRAVEL_DEV=1) reloads a single worker; otherwise run multi-worker
 # ----------------------------
 if __name__ == "__main__":
     import uvicorn
     import pathlib
-    logger.info("Starting Simple Travel Planner on http://127.0.0.1:8000")
+    import importlib.util
+    import os
     module_name = pathlib.Path(__file__).stem  # filename without .py
     import_string = f"{module_name}:app"
-    # Use import string so --reload works when uvicorn restarts child process
-    uvicorn.run(import_string, host="127.0.0.1", port=8000, reload=True)
+    # "auto" still picks uvloop/httptools whenever they are installed
+    loop = "uvloop" if uvloop is not None else "auto"
+    http = "httptools" if importlib.util.find_spec("httptools") is not None else "auto"
+    if os.environ.get("TRAVEL_DEV") == "1":
+        logger.info("Starting Simple Travel Planner (dev) on http://127.0.0.1:8000")
+        # Use import string so --reload works when uvicorn restarts child process
+        uvicorn.run(import_string, host="127.0.0.1", port=8000, reload=True, loop=loop)
+    else:
+        logger.info("Starting Simple Travel Planner on http://0.0.0.0:8000")
+        # Import string is also required for multiple workers.
+        # Each worker has its own METRICS, caches and ticker, so reported metrics are per worker.
+        uvicorn.run(import_string, host="0.0.0.0", port=8000, workers=os.cpu_count(), loop=loop, http=http,
+                    access_log=False, log_level="warning")
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+
+from a import app
+
+client = TestClient(app)
+
+
+def test_plan_rejects_invalid_utf8_body_with_422():
+    for body in (b"\xff\xfe", b'{"from_city":"\xff","to_city":"b","budget":1,"days":1}'):
+        res = client.post("/plan", content=body, headers={"Content-Type": "application/json"})
+        assert res.status_code == 422
+        assert res.json()["detail"][0]["loc"][0] == "body"
+
+
+def test_plan_rejects_non_json_content_type_with_422():
+    body = b'{"from_city":"a","to_city":"b","budget":1,"days":1}'
+    res = client.post("/plan", content=body, headers={"Content-Type": "text/plain"})
+    assert res.status_code == 422
+
+
+def test_repeated_plan_gets_fresh_plan_id_and_same_content():
+    body = {"from_city": "Paris", "to_city": "Rome", "budget": 50000, "days": 3}
+    first = client.post("/plan", json=body).json()
+    second = client.post("/plan", json=body).json()
+    assert list(second) == ["summary", "raw", "metrics", "generated_at"]
+    assert first["summary"].pop("plan_id") != second["summary"].pop("plan_id")
+    assert first["summary"] == second["summary"]
+    assert first["raw"] == second["raw"]
+
+
+def test_homepage_304_repeats_vary_for_both_encodings():
+    for accept in ("gzip", "identity"):
+        first = client.get("/", headers={"Accept-Encoding": accept})
+        res = client.get("/", headers={"Accept-Encoding": accept, "If-None-Match": first.headers["etag"]})
+        assert res.status_code == 304
+        assert res.headers["vary"] == first.headers["vary"] == "Accept-Encoding"